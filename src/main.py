@@ -10,17 +10,316 @@ A Python program to read, parse and display thermal data from the
 Topdon TC001 or IniRay P2Pro Thermal camera!
 '''
 
+import concurrent.futures
+import functools
+import queue
+import threading
 import time
 import cv2
 import click
+import numpy as np
 from thermal_camera import ThermalCamera
 
+# Key codes of the key bindings
+_K_A = ord('a')
+_K_C = ord('c')
+_K_D = ord('d')
+_K_E = ord('e')
+_K_F = ord('f')
+_K_H = ord('h')
+_K_M = ord('m')
+_K_O = ord('o')
+_K_P = ord('p')
+_K_Q = ord('q')
+_K_R = ord('r')
+_K_S = ord('s')
+_K_T = ord('t')
+_K_V = ord('v')
+_K_W = ord('w')
+_K_X = ord('x')
+_K_Z = ord('z')
+_K_0 = ord('0')
+_K_9 = ord('9')
+
+# Font settings of the outlined labels next to the markers
+LABEL_FONT = cv2.FONT_HERSHEY_SIMPLEX
+LABEL_FONT_SCALE = 0.45
+
+@functools.lru_cache(maxsize=256)
+def _render_label(text):
+    """Renders a label with a black outline and a yellow fill
+
+    Args:
+        text (str): The label text
+
+    Returns:
+        tuple: The BGR sprite on a black background, the inverse coverage (255 - alpha)
+            of the sprite and the position of the text origin within the sprite.
+    """
+    (width, height), baseline = cv2.getTextSize(text, LABEL_FONT, LABEL_FONT_SCALE, 2)
+    origin = (2, height + 2)
+
+    sprite = np.zeros((height + baseline + 4, width + 4, 3), np.uint8)
+    outline_alpha = np.zeros(sprite.shape[:2], np.uint8)
+    fill_alpha = np.zeros(sprite.shape[:2], np.uint8)
+
+    cv2.putText(sprite, text, origin, LABEL_FONT, LABEL_FONT_SCALE, (0, 0, 0), 2, cv2.LINE_AA)
+    cv2.putText(sprite, text, origin, LABEL_FONT, LABEL_FONT_SCALE, (0, 255, 255), 1, cv2.LINE_AA)
+
+    # The background shows through where neither the outline nor the fill cover it
+    cv2.putText(outline_alpha, text, origin, LABEL_FONT, LABEL_FONT_SCALE, 255, 2, cv2.LINE_AA)
+    cv2.putText(fill_alpha, text, origin, LABEL_FONT, LABEL_FONT_SCALE, 255, 1, cv2.LINE_AA)
+    inverse_alpha = (255 - outline_alpha.astype(np.uint16)) * (255 - fill_alpha) // 255
+    inverse_alpha = inverse_alpha[..., np.newaxis]
+
+    return sprite, inverse_alpha, origin
+
+@functools.lru_cache(maxsize=8)
+def _render_crosshairs(crosshair_size):
+    """Renders white crosshairs with a black center line
+
+    Args:
+        crosshair_size (int): Length of the crosshair arms
+
+    Returns:
+        tuple: The BGR sprite, the mask of the crosshair pixels
+            and the position of the crosshair center within the sprite.
+    """
+    # Leave room for the line thickness around the arms
+    center = crosshair_size + 2
+    sprite = np.zeros((2 * center + 1, 2 * center + 1, 3), np.uint8)
+    mask = np.zeros(sprite.shape[:2], np.uint8)
+
+    # The vertical and the horizontal line
+    lines = np.array([[[center, center + crosshair_size], [center, center - crosshair_size]],
+                      [[center + crosshair_size, center], [center - crosshair_size, center]]],
+                     np.int32)
+
+    # The black line is drawn on top of the white line, within its mask
+    cv2.polylines(sprite, lines, False, (255, 255, 255), 2, cv2.LINE_8)
+    cv2.polylines(sprite, lines, False, (0, 0, 0), 1, cv2.LINE_8)
+    cv2.polylines(mask, lines, False, 255, 2, cv2.LINE_8)
+
+    return sprite, mask[..., np.newaxis].astype(bool), (center, center)
+
+def _clip_sprite(image, sprite, position, origin):
+    """Computes the area of a sprite that lies within the frame.
+
+    Args:
+        image (ndarray): The frame data
+        sprite (ndarray): The sprite
+        position (tuple): Position of the sprite origin in the frame
+        origin (tuple): Position of the sprite origin within the sprite
+
+    Returns:
+        tuple: The frame area and the matching sprite rows and columns,
+            or None if the sprite lies outside of the frame.
+    """
+    # Sprite area in frame coordinates
+    left = position[0] - origin[0]
+    top = position[1] - origin[1]
+
+    # Clip the sprite to the frame
+    x_start = max(left, 0)
+    y_start = max(top, 0)
+    x_end = min(left + sprite.shape[1], image.shape[1])
+    y_end = min(top + sprite.shape[0], image.shape[0])
+    if x_start >= x_end or y_start >= y_end:
+        return None
+
+    return (image[y_start:y_end, x_start:x_end],
+            slice(y_start - top, y_end - top),
+            slice(x_start - left, x_end - left))
+
+def _draw_label(image, text, position):
+    """Draws an outlined label, the label is clipped at the image borders
+
+    Args:
+        image (ndarray): The frame data
+        text (str): The label text
+        position (tuple): Position of the text origin (bottom left corner) in the frame
+    """
+    sprite, inverse_alpha, origin = _render_label(text)
+    clipped = _clip_sprite(image, sprite, position, origin)
+    if clipped is None:
+        return
+    roi, sprite_rows, sprite_cols = clipped
+
+    # The sprite was drawn on black, so it is already weighted by its coverage
+    roi[...] = sprite[sprite_rows, sprite_cols] + \
+        (roi * inverse_alpha[sprite_rows, sprite_cols] + 127) // 255
+
+class CaptureThread(threading.Thread):
+    """Thread that reads and processes frames from the thermal camera and
+        hands the most recent one over to the GUI, together with its readings.
+    """
+
+    def __init__(self, thermal_camera):
+        super().__init__(daemon=True)
+
+        self.thermal_camera = thermal_camera
+
+        # Only the latest (frame, FrameStats) pair is kept, older frames are dropped
+        self.frames = queue.Queue(maxsize=1)
+        self.error = None
+        self._stop_event = threading.Event()
+
+    def run(self):
+        """ Capture loop """
+        try:
+            while not self._stop_event.is_set() and self.thermal_camera.capture_status():
+                # Always process the newest frame, so the frame the GUI takes
+                # next was captured as late as possible
+                frame = self.thermal_camera.get_frame()
+                stats = self.thermal_camera.stats
+
+                # Drop the previous frame if the GUI did not pick it up yet
+                try:
+                    self.frames.get_nowait()
+                except queue.Empty:
+                    pass
+                self.frames.put((frame, stats))
+        except Exception as error:
+            # Any error ends the capture, it is raised again in the main thread
+            self.error = error
+
+    def stop(self):
+        """ Stops the capture loop and waits for the thread to finish. """
+        self._stop_event.set()
+        if self.is_alive():
+            self.join()
+
+class RecordingThread(threading.Thread):
+    """Thread that owns the video writer and appends the queued frames
+        to the video file.
+    """
+
+    # Number of frames that can wait for the encoder before frames are dropped
+    QUEUE_SIZE = 4
+
+    # Maximum time between updates of the elapsed time, in seconds
+    TICK_INTERVAL = 0.25
+
+    def __init__(self, frame_size, *writer_options):
+        """Initializes the recording thread
+
+        Args:
+            frame_size (tuple): The (width, height) of the video.
+            writer_options: Tuples of arguments to open the cv2.VideoWriter with, the
+                first one that can be opened is used. The video file is opened in the
+                thread, so the GUI does not wait for it.
+        """
+        super().__init__(daemon=True)
+
+        self.frame_size = frame_size
+        self._writer_options = writer_options
+        self.frames = queue.Queue(maxsize=self.QUEUE_SIZE)
+        self.dropped_frames = 0
+        self.error = None
+
+        # The elapsed time text is only updated once per second
+        self.elapsed_time = "00:00:00"
+        self._start_time = time.monotonic()
+        self._elapsed_sec = 0
+
+    def run(self):
+        """ Recording loop, a None frame ends the recording """
+        video_handle = None
+        try:
+            for writer_args in self._writer_options:
+                video_handle = cv2.VideoWriter(*writer_args)
+                if video_handle.isOpened():
+                    break
+            else:
+                print('Could not open a video file, the recording is stopped')
+                return
+
+            while True:
+                self._update_elapsed_time()
+                try:
+                    frame = self.frames.get(timeout=self.TICK_INTERVAL)
+                except queue.Empty:
+                    continue
+                if frame is None:
+                    break
+                # The scaling may be changed while recording, the video keeps its size
+                if frame.shape[1::-1] != self.frame_size:
+                    frame = cv2.resize(frame, self.frame_size, interpolation=cv2.INTER_AREA)
+                video_handle.write(frame)
+        except Exception as error:
+            # A failed recording does not end the capture, it is only reported
+            self.error = error
+            print(f'The recording failed: {error}')
+        finally:
+            if video_handle is not None:
+                video_handle.release()
+
+    def _update_elapsed_time(self):
+        """ Updates the elapsed time text when the elapsed second changes. """
+        elapsed_sec = int(time.monotonic() - self._start_time)
+        if elapsed_sec != self._elapsed_sec:
+            self._elapsed_sec = elapsed_sec
+            # A str assignment is atomic, so the GUI can read it without a lock
+            self.elapsed_time = \
+                f'{elapsed_sec // 3600:02d}:{elapsed_sec // 60 % 60:02d}:{elapsed_sec % 60:02d}'
+
+    def write(self, frame):
+        """ Queues a frame for the video file. The frame is dropped if the
+            encoder can not keep up, so the caller never has to wait.
+
+        Args:
+            frame (UMat): The frame data.
+        """
+        try:
+            self.frames.put_nowait(frame)
+        except queue.Full:
+            # Only report the first dropped frame, the total is reported at the end
+            if not self.dropped_frames:
+                print('The encoder can not keep up, dropping frames')
+            self.dropped_frames += 1
+
+    def stop(self):
+        """ Writes the remaining frames, closes the video file and waits
+            for the thread to finish.
+        """
+        # The thread may have ended on an error, then nobody takes the None
+        # from a full queue
+        while self.is_alive():
+            try:
+                self.frames.put(None, timeout=self.TICK_INTERVAL)
+                break
+            except queue.Full:
+                continue
+        self.join()
+
+        if self.dropped_frames:
+            print(f'Dropped {self.dropped_frames} frames while recording')
+
 class ThermalApp:
     """Class to represent the thermal camera application and act as a container for
         all its functions.
     """
     WINDOW_NAME = 'Thermal'
 
+    # Time to wait for a new frame before polling the capture thread again
+    FRAME_TIMEOUT = 0.5
+
+    # GStreamer hardware H.264 encoders to try for recordings (NVENC, VA-API)
+    HARDWARE_ENCODERS = ('nvh264enc', 'vaapih264enc')
+
+    # Number of frames between checks whether the window is visible
+    WINDOW_CHECK_INTERVAL = 15
+
+    # pollKey does not wait like waitKey(1) does, but it is missing in older OpenCV builds
+    _poll_key = staticmethod(getattr(cv2, 'pollKey', lambda: cv2.waitKey(1)))
+
+    # Size of the HUD box in the top left corner
+    HUD_WIDTH = 160
+    HUD_HEIGHT = 120
+
+    # Distance between the baselines of the HUD lines
+    HUD_LINE_SPACING = 14
+
     def __init__(self, thermal_camera):
 
         self.thermal_camera = thermal_camera
@@ -30,17 +329,32 @@ class ThermalApp:
         self.fullscreen = False
         self.hud = True
 
-        self.video_handle = None
+        self.capture_thread = None
+        self.recording_thread = None
         self.recording = False
-        self.recording_start_time = None
-        self.elapsed_time = "00:00:00"
         self.snaptime = "None"
+        self._io_pool = concurrent.futures.ThreadPoolExecutor(max_workers=1)
 
         self.point_erase_mode = False
 
+        # Number of frames handled so far
+        self._frame_ctr = 0
+        self.window_visible = True
+
+        # The HUD is rendered once and reused, only the lines whose
+        # values changed are rendered again
+        self._hud_cache = None
+        self._hud_signature = None
+        self._hud_lines = None
+
         # GUI texts
         self.gui_colormap_text = self.thermal_camera.colormap_name
 
+        # Positions in the scaled frame, they only change with the scaling.
+        # They are computed from the scale of the drawn frame, see _draw_gui
+        self._center_pos = None
+        self._center_scale = None
+
         # Create the GUI window
         self._create_window()
 
@@ -48,23 +362,65 @@ class ThermalApp:
         self._start_capture()
 
     def _start_capture(self):
-        """ Main program loop """
-
-        while self.thermal_camera.capture_status():
-            frame = self.thermal_camera.get_frame()
-
-            # Draw the GUI elements and temperature markers
-            self._draw_gui(frame)
-
-            # Display the image in the window
-            cv2.imshow(self.WINDOW_NAME, frame)
+        """ Main program loop, frames are captured and processed in a
+            separate thread. The GUI has to stay in the main thread.
+        """
+        self.capture_thread = CaptureThread(self.thermal_camera)
+        self.capture_thread.start()
+
+        try:
+            while self.capture_thread.is_alive():
+                try:
+                    frame, stats = self.capture_thread.frames.get(timeout=self.FRAME_TIMEOUT)
+                except queue.Empty:
+                    continue
+
+                # The drawing functions have no OpenCL implementation and would map
+                # a UMat back to host memory for every call, so the GUI is drawn on
+                # a host frame that is downloaded only once.
+                if isinstance(frame, cv2.UMat):
+                    frame = frame.get()
+
+                # Check the window state, this does not need to happen on every frame
+                self._frame_ctr += 1
+                if self._frame_ctr % self.WINDOW_CHECK_INTERVAL == 0:
+                    self._update_window_visibility()
+
+                # Skip drawing if the window is not visible,
+                # showing the frame would also open a closed window again
+                if self.window_visible:
+                    # Draw the GUI elements and temperature markers
+                    self._draw_gui(frame, stats)
+
+                    # Display the image in the window
+                    cv2.imshow(self.WINDOW_NAME, frame)
+
+                # If we are recording
+                if self.recording:
+                    self._handle_recording(frame)
+
+                # Handle key input
+                self._handle_keyboard_input(frame)
+        finally:
+            self._shutdown()
+
+        # Pass capture errors on to the caller
+        if self.capture_thread.error:
+            raise self.capture_thread.error
+
+    def _shutdown(self):
+        """ Stops the capture and the recording, waits for pending snapshots
+            and releases the camera and the window.
+        """
+        self.capture_thread.stop()
+        self.thermal_camera.stop_capture()
 
-            # If we are recording
-            if self.recording:
-                self._handle_recording(frame)
+        if self.recording:
+            self.recording = False
+            self.recording_thread.stop()
 
-            # Handle key input
-            self._handle_keyboard_input(frame)
+        self._io_pool.shutdown()
+        cv2.destroyAllWindows()
 
     @staticmethod
     def _handle_mouse_input(event, x, y, _, param):
@@ -82,272 +438,345 @@ class ThermalApp:
         Args:
             image (UMat): The frame data.
         """
-        #TODO: Load keymap from a configuration file
+        # Stop if the window has been closed with the X of the window
+        if not self.window_visible:
+            self.capture_thread.stop()
+            return
 
+        key = self._poll_key()
+
+        # No key was pressed
+        if key == -1:
+            return
+
+        if self.point_erase_mode and _K_0 <= key <= _K_9:
+            number = key - _K_0
+            self.thermal_camera.remove_point(number)
+            print(f'Removed user monitor point #{number}')
+            self.point_erase_mode = False
+
+        handler = self._KEYMAP.get(key)
+        if handler:
+            handler(self, image)
+
+    def _update_window_visibility(self):
+        """ Updates whether the window is visible. """
         #FIXME: This solution does not seem to work in GNOME?
-        # Detect if the window has been closed with the X of the window
-        if cv2.getWindowProperty(self.WINDOW_NAME, cv2.WND_PROP_VISIBLE) >= 1:
-            #print(cv2.getWindowProperty(self.WINDOW_NAME, cv2.WND_PROP_VISIBLE))
-            key = cv2.waitKey(1)
-
-            if key == ord('o'):
-                if self.point_erase_mode:
-                    self.point_erase_mode = False
-                    print('Exited point erase mode')
-                else:
-                    self.point_erase_mode = True
-                    print('Entered point erase mode')
-
-
-            if self.point_erase_mode and key >= 48 and key <= 57:
-                number = int(chr(key))
-                self.thermal_camera.remove_point(number)
-                print(f'Removed user monitor point #{number}')
-                self.point_erase_mode = False
-
-            if key == ord('a'): #Increase blur radius
-                self.thermal_camera.increase_blur()
-            if key == ord('z'): #Decrease blur radius
-                self.thermal_camera.decrease_blur()
-
-            if key == ord('s'): #Increase threshold
-                self.thermal_camera.increase_threshold()
-            if key == ord('x'): #Decrease threashold
-                self.thermal_camera.decrease_threshold()
-
-            if key == ord('d'): #Increase scale
-                self.thermal_camera.increase_scaling()
-                if not self.fullscreen and not self.is_pi:
-                    cv2.resizeWindow(self.WINDOW_NAME,
-                                    self.thermal_camera.scaled_width,
-                                    self.thermal_camera.scaled_height)
-
-            if key == ord('c'): #Decrease self.thermal_camera.scale
-                self.thermal_camera.decrease_scaling()
-                if not self.fullscreen and not self.is_pi:
-                    cv2.resizeWindow(self.WINDOW_NAME,
-                                    self.thermal_camera.scaled_width,
-                                    self.thermal_camera.scaled_height)
-
-            if key == ord('e'): #enable fullscreen
-                self.fullscreen = True
-                cv2.namedWindow(self.WINDOW_NAME, cv2.WND_PROP_FULLSCREEN)
-                cv2.setWindowProperty(self.WINDOW_NAME, cv2.WND_PROP_FULLSCREEN, cv2.WINDOW_FULLSCREEN)
-            if key == ord('w'): #disable fullscreen
-                self.fullscreen = False
-                cv2.namedWindow(self.WINDOW_NAME, cv2.WINDOW_GUI_NORMAL)
-                cv2.setWindowProperty(self.WINDOW_NAME, cv2.WND_PROP_AUTOSIZE,cv2.WINDOW_GUI_NORMAL)
-                cv2.resizeWindow(self.WINDOW_NAME,
-                                self.thermal_camera.scaled_width,
-                                self.thermal_camera.scaled_height)
-
-            if key == ord('f'): # Increase contrast
-                self.thermal_camera.increase_contrast()
-            if key == ord('v'): # Decrease contrast
-                self.thermal_camera.decrease_contrast()
-
-            # Hud on/off
-            if key == ord('h'):
-                if self.hud:
-                    self.hud=False
-                else:
-                    self.hud=True
-
-            if key == ord('m'): #m to cycle through color maps
-                self.gui_colormap_text = self.thermal_camera.next_colormap()
-
-            if key == ord('r') and not self.recording: #r to start reording
-                self.video_handle = self._start_recording()
-                self.recording = True
-                self.recording_start_time = time.time()
-            if key == ord('t'): #f to finish reording
-                self.recording = False
-                self.elapsed_time = "00:00:00"
-
-            if key == ord('p'): #f to finish reording
-                self.snaptime = self._snapshot(image)
-
-            if key == ord('q'):
-                self.thermal_camera.stop_capture()
-                self.thermal_camera.stop_capture()
-                cv2.destroyAllWindows()
+        self.window_visible = cv2.getWindowProperty(self.WINDOW_NAME, cv2.WND_PROP_VISIBLE) >= 1
+
+    def _key_toggle_point_erase_mode(self, _image):
+        """ Enters or exits the point erase mode. """
+        if self.point_erase_mode:
+            self.point_erase_mode = False
+            print('Exited point erase mode')
         else:
-            self.thermal_camera.stop_capture()
-            cv2.destroyAllWindows()
+            self.point_erase_mode = True
+            print('Entered point erase mode')
+
+    def _key_increase_blur(self, _image):
+        """ Increases the blur radius. """
+        self.thermal_camera.increase_blur()
+
+    def _key_decrease_blur(self, _image):
+        """ Decreases the blur radius. """
+        self.thermal_camera.decrease_blur()
+
+    def _key_increase_threshold(self, _image):
+        """ Increases the label threshold. """
+        self.thermal_camera.increase_threshold()
+
+    def _key_decrease_threshold(self, _image):
+        """ Decreases the label threshold. """
+        self.thermal_camera.decrease_threshold()
+
+    def _key_increase_scaling(self, _image):
+        """ Increases the scale and resizes the window accordingly. """
+        self.thermal_camera.increase_scaling()
+        if not self.fullscreen and not self.is_pi:
+            cv2.resizeWindow(self.WINDOW_NAME,
+                            self.thermal_camera.scaled_width,
+                            self.thermal_camera.scaled_height)
+
+    def _key_decrease_scaling(self, _image):
+        """ Decreases the scale and resizes the window accordingly. """
+        self.thermal_camera.decrease_scaling()
+        if not self.fullscreen and not self.is_pi:
+            cv2.resizeWindow(self.WINDOW_NAME,
+                            self.thermal_camera.scaled_width,
+                            self.thermal_camera.scaled_height)
+
+    def _recompute_scale_dependent(self, scale):
+        """ Updates the cached positions in the scaled frame after the scaling changed.
+
+        Args:
+            scale (int): The scaling multiplier of the drawn frame.
+        """
+        center_point = self.thermal_camera.center_point
+        self._center_pos = (center_point.x_pos * scale, center_point.y_pos * scale)
+        self._center_scale = scale
+
+    def _key_enable_fullscreen(self, _image):
+        """ Switches the window to fullscreen. """
+        self.fullscreen = True
+        cv2.namedWindow(self.WINDOW_NAME, cv2.WND_PROP_FULLSCREEN)
+        cv2.setWindowProperty(self.WINDOW_NAME, cv2.WND_PROP_FULLSCREEN, cv2.WINDOW_FULLSCREEN)
+
+    def _key_disable_fullscreen(self, _image):
+        """ Switches the window back to windowed mode. """
+        self.fullscreen = False
+        cv2.namedWindow(self.WINDOW_NAME, cv2.WINDOW_GUI_NORMAL)
+        cv2.setWindowProperty(self.WINDOW_NAME, cv2.WND_PROP_AUTOSIZE,cv2.WINDOW_GUI_NORMAL)
+        cv2.resizeWindow(self.WINDOW_NAME,
+                        self.thermal_camera.scaled_width,
+                        self.thermal_camera.scaled_height)
+
+    def _key_increase_contrast(self, _image):
+        """ Increases the contrast. """
+        self.thermal_camera.increase_contrast()
+
+    def _key_decrease_contrast(self, _image):
+        """ Decreases the contrast. """
+        self.thermal_camera.decrease_contrast()
+
+    def _key_toggle_hud(self, _image):
+        """ Shows or hides the HUD. """
+        self.hud = not self.hud
+
+    def _key_next_colormap(self, _image):
+        """ Cycles through the colormaps. """
+        self.gui_colormap_text = self.thermal_camera.next_colormap()
+
+    def _key_start_recording(self, _image):
+        """ Starts a video recording, if not already recording. """
+        if not self.recording:
+            self.recording_thread = self._start_recording()
+            self.recording = True
+
+    def _key_stop_recording(self, _image):
+        """ Finishes the current video recording. """
+        if self.recording:
+            self.recording = False
+            self.recording_thread.stop()
+
+    def _key_snapshot(self, image):
+        """ Saves a snapshot of the current frame. """
+        self.snaptime = self._snapshot(image)
+
+    def _key_quit(self, _image):
+        """ Stops the capture, which ends the main loop. """
+        self.capture_thread.stop()
 
     def _handle_recording(self, image):
-        """ Appends a frame to the video stream ad updates the elapsed time.
+        """ Queues a frame for the video stream, or ends the recording
+            if the recording thread has stopped on an error.
 
         Args:
             image (UMat): The frame data.
         """
-        self.elapsed_time = time.time() - self.recording_start_time
-        self.elapsed_time = time.strftime("%H:%M:%S", time.gmtime(self.elapsed_time))
-        #print(elapsed)
-        self.video_handle.write(image)
-
-    def _draw_gui(self, image):
+        if not self.recording_thread.is_alive():
+            self.recording = False
+            self.recording_thread.stop()
+            return
+        self.recording_thread.write(image)
+
+    @property
+    def elapsed_time(self):
+        """ str: The elapsed recording time, it is updated by the recording thread. """
+        if self.recording:
+            return self.recording_thread.elapsed_time
+        return "00:00:00"
+
+    def _draw_gui(self, image, stats):
         """ Draws the GUI
 
         Args:
             image (UMat): The frame data.
+            stats (FrameStats): The temperature readings of the frame.
         """
+        # The scale the frame was built with, the scaling may have been
+        # changed since the frame was queued
+        scale = stats.scale
+        if scale != self._center_scale:
+            self._recompute_scale_dependent(scale)
+
         # Draw center crosshairs
-        self._draw_crosshairs(image, self.thermal_camera.center_point)
+        self._draw_crosshairs(image, *self._center_pos,
+                            self._format_temperature(stats.center_point.temperature))
 
-        # Draw user points
-        for idx, point in enumerate(self.thermal_camera.user_points):
-            self._draw_crosshairs(image, point, point_name=f'P{idx}', crosshair_size=10)
+        # Draw user points, their positions are scaled all at once
+        positions, temperatures = stats.user_point_readings
+        for idx, ((x_pos, y_pos), temperature) in enumerate(zip((positions * scale).tolist(),
+                                                                temperatures.tolist())):
+            self._draw_crosshairs(image, x_pos, y_pos,
+                                self._format_temperature(temperature),
+                                point_name=f'P{idx}', crosshair_size=10)
 
         # Show hud
         if self.hud:
-            self._draw_hud(image)
+            self._draw_hud(image, stats.avg_temp)
 
         # Display floating max temperature
         threshold = self.thermal_camera.threshold
-        if self.thermal_camera.max_point.temperature > self.thermal_camera.avg_temp + threshold:
-            self._draw_circle(image, self.thermal_camera.max_point, (0, 0, 255))
+        if stats.max_point.temperature > stats.avg_temp + threshold:
+            self._draw_circle(image, stats.max_point, scale, (0, 0, 255))
 
         # Display floating min temperature
-        if self.thermal_camera.min_point.temperature < self.thermal_camera.avg_temp - threshold:
+        if stats.min_point.temperature < stats.avg_temp - threshold:
             self._draw_circle(image,
-                            self.thermal_camera.min_point,
+                            stats.min_point,
+                            scale,
                             (255, 0, 0))
 
-    def _draw_circle(self, image, point, color):
+    def _draw_circle(self, image, point, scale, color):
         """ Draws a circle of the specified color at the sp
 
         Args:
             image (UMat): The frame data
             position (tuple): The circle location in image coordinates,
+            scale (int): The scaling multiplier of the frame.
             color (tuple): Circle color in (B,G,R) format.
             temp (float): The temperature value to display next to the circle.
         """
-        col = point.x_pos
-        row = point.y_pos
-        temp = point.temperature
-        scale = self.thermal_camera.scale
-
-        cv2.circle(image, (row*scale, col*scale), 5, (0,0,0), 2)
-        cv2.circle(image, (row*scale, col*scale), 5, color, -1)
-        cv2.putText(image,str(temp)+' C', ((row*scale)+10, (col*scale)+5),\
-        cv2.FONT_HERSHEY_SIMPLEX, 0.45,(0,0,0), 2, cv2.LINE_AA)
-        cv2.putText(image,str(temp)+' C', ((row*scale)+10, (col*scale)+5),\
-        cv2.FONT_HERSHEY_SIMPLEX, 0.45,(0, 255, 255), 1, cv2.LINE_AA)
-
-    def _draw_hud(self, image):
+        # Position of the point in the scaled frame, in (x, y) order like
+        # in _draw_crosshairs
+        x_pos = point.x_pos * scale
+        y_pos = point.y_pos * scale
+        center = (x_pos, y_pos)
+        text = self._format_temperature(point.temperature)
+        text_pos = (x_pos + 10, y_pos + 5)
+
+        cv2.circle(image, center, 5, (0,0,0), 2)
+        cv2.circle(image, center, 5, color, -1)
+        _draw_label(image, text, text_pos)
+
+    @staticmethod
+    def _format_temperature(temperature):
+        """ Formats a temperature for a marker label, with 2 decimals like the HUD.
+
+        Args:
+            temperature (float): The temperature
+
+        Returns:
+            str: The label text.
+        """
+        return f'{temperature:.2f} C'
+
+    def _draw_hud(self, image, avg_temp):
         """ Draws the HUD box in the right corner of the
            provided frame
 
         Args:
             image (UMat): The frame data.
+            avg_temp (float): The average temperature of the frame.
         """
-        # Display black box for our data
-        cv2.rectangle(image, (0, 0), (160, 120), (0,0,0), -1)
-        # Put text in the box
-        cv2.putText(image, f'Avg Temp: {self.thermal_camera.avg_temp} C', (10, 14),\
-        self.font, 0.4,(0, 255, 255), 1, cv2.LINE_AA)
-
-        cv2.putText(image, f'Label Threshold: {self.thermal_camera.threshold} C', (10, 28),\
-        self.font, 0.4,(0, 255, 255), 1, cv2.LINE_AA)
-
-        cv2.putText(image, f'Colormap: {self.gui_colormap_text}', (10, 42),\
-        self.font, 0.4,(0, 255, 255), 1, cv2.LINE_AA)
-
-        cv2.putText(image, f'Blur: {self.thermal_camera.blur_radius}', (10, 56),\
-        self.font, 0.4,(0, 255, 255), 1, cv2.LINE_AA)
+        # The average is formatted here instead of rounded in every frame,
+        # so the HUD is only rendered again when the displayed text changes
+        avg_temp_text = f'{avg_temp:.2f}'
+        hud_signature = (avg_temp_text,
+                        self.thermal_camera.threshold,
+                        self.gui_colormap_text,
+                        self.thermal_camera.blur_radius,
+                        self.thermal_camera.scale,
+                        self.thermal_camera.alpha,
+                        self.snaptime,
+                        self.recording,
+                        self.elapsed_time)
+
+        # Only render the HUD lines again if the displayed values changed
+        if hud_signature != self._hud_signature:
+            self._render_hud(avg_temp_text)
+            self._hud_signature = hud_signature
+
+        image[0:self.HUD_HEIGHT, 0:self.HUD_WIDTH] = self._hud_cache
+
+    def _render_hud(self, avg_temp_text):
+        """ Renders the HUD lines with the current settings into the HUD box.
+            Only the lines whose text changed are rendered, usually just the
+            average temperature.
 
-        cv2.putText(image, f'Scaling: {self.thermal_camera.scale}', (10, 70),\
-        self.font, 0.4,(0, 255, 255), 1, cv2.LINE_AA)
-
-        cv2.putText(image, f'Contrast: {self.thermal_camera.alpha}', (10, 84),\
-        self.font, 0.4,(0, 255, 255), 1, cv2.LINE_AA)
-
-
-        cv2.putText(image,f'Snapshot: {self.snaptime}', (10, 98),\
-        self.font, 0.4,(0, 255, 255), 1, cv2.LINE_AA)
-
-        if not self.recording:
-            cv2.putText(image, f'Recording: {self.elapsed_time}', (10, 112),\
-            self.font, 0.4,(200, 200, 200), 1, cv2.LINE_AA)
-        else:
-            cv2.putText(image, f'Recording: {self.elapsed_time}', (10, 112),\
-            self.font, 0.4,(40, 40, 255), 1, cv2.LINE_AA)
-
-
-    def _draw_crosshairs(self, image, point, point_name=None, crosshair_size=20):
+        Args:
+            avg_temp_text (str): The formatted average temperature.
+        """
+        recording_color = (40, 40, 255) if self.recording else (200, 200, 200)
+        hud_lines = ((f'Avg Temp: {avg_temp_text} C', (0, 255, 255)),
+                    (f'Label Threshold: {self.thermal_camera.threshold} C', (0, 255, 255)),
+                    (f'Colormap: {self.gui_colormap_text}', (0, 255, 255)),
+                    (f'Blur: {self.thermal_camera.blur_radius} sensor px', (0, 255, 255)),
+                    (f'Scaling: {self.thermal_camera.scale}', (0, 255, 255)),
+                    (f'Contrast: {self.thermal_camera.alpha}', (0, 255, 255)),
+                    (f'Snapshot: {self.snaptime}', (0, 255, 255)),
+                    (f'Recording: {self.elapsed_time}', recording_color))
+
+        if self._hud_cache is None:
+            # Black box for our data
+            self._hud_cache = np.zeros((self.HUD_HEIGHT, self.HUD_WIDTH, 3), np.uint8)
+            self._hud_lines = [None] * len(hud_lines)
+
+        for index, (line, cached_line) in enumerate(zip(hud_lines, self._hud_lines)):
+            if line == cached_line:
+                continue
+
+            # Clear the band of the line and put the new text in it
+            baseline = self.HUD_LINE_SPACING * (index + 1)
+            self._hud_cache[baseline - 10:baseline + 4] = 0
+            cv2.putText(self._hud_cache, line[0], (10, baseline),\
+            self.font, 0.4, line[1], 1, cv2.LINE_AA)
+            self._hud_lines[index] = line
+
+    def _draw_crosshairs(self, image, x_pos, y_pos, temp_text, point_name=None,
+                        crosshair_size=20):
         """ Draws crosshairs in the specified poitn and
         frame and show the temperature of the point
 
         Args:
             image (UMat): The frame data
-            point (Point): The point object
+            x_pos (int): x position of the point in the scaled frame
+            y_pos (int): y position of the point in the scaled frame
+            temp_text (str): The temperature text to display next to the point
         """
-        scale = self.thermal_camera.scale
-
-        # Draw the crosshairs
-        cv2.line(image, (point.x_pos * scale, point.y_pos * scale + crosshair_size),\
-        (point.x_pos * scale, point.y_pos * scale - crosshair_size), (255, 255, 255), 2) #vline
-        cv2.line(image, (point.x_pos * scale + crosshair_size, point.y_pos * scale) ,\
-        (point.x_pos * scale - crosshair_size, point.y_pos * scale) ,(255,255,255), 2) #hline
-
-        cv2.line(image,(point.x_pos * scale, point.y_pos * scale + crosshair_size),\
-        (point.x_pos * scale, point.y_pos * scale- crosshair_size), (0, 0, 0), 1) #vline
-        cv2.line(image,(point.x_pos * scale + crosshair_size, point.y_pos * scale) ,\
-        (point.x_pos * scale - crosshair_size, point.y_pos * scale), (0, 0, 0), 1) #hline
+        # Copy the prerendered crosshairs into the frame
+        sprite, mask, origin = _render_crosshairs(crosshair_size)
+        clipped = _clip_sprite(image, sprite, (x_pos, y_pos), origin)
+        if clipped is not None:
+            roi, sprite_rows, sprite_cols = clipped
+            np.copyto(roi, sprite[sprite_rows, sprite_cols],
+                      where=mask[sprite_rows, sprite_cols])
 
         # Display the temperature text
-        # FIXME: Implement arguments as private class constants
-        cv2.putText(image,
-                    f'{point.temperature} C',
-                    (point.x_pos * scale + 10, point.y_pos * scale - 10),
-                    self.font,
-                    0.45,
-                    (0, 0, 0),
-                    2,
-                    cv2.LINE_AA)
-        cv2.putText(image,
-                    f'{point.temperature} C',
-                    (point.x_pos * scale + 10, point.y_pos * scale - 10),
-                    self.font,
-                    0.45,
-                    (0, 255, 255),
-                    1,cv2.LINE_AA)
+        _draw_label(image, temp_text, (x_pos + 10, y_pos - 10))
 
         # Display optional text
         if point_name:
-            cv2.putText(image,
-                        f'{point_name}',
-                        (point.x_pos * scale + 10, point.y_pos * scale - 25),
-                        self.font,
-                        0.45,
-                        (0, 0, 0),
-                        2,
-                        cv2.LINE_AA)
-            cv2.putText(image,
-                        f'{point_name}',
-                        (point.x_pos * scale + 10, point.y_pos * scale - 25),
-                        self.font,
-                        0.45,
-                        (0, 255, 255),
-                        1,
-                        cv2.LINE_AA)
+            _draw_label(image, f'{point_name}', (x_pos + 10, y_pos - 25))
 
 
     def _start_recording(self):
         """ Starts a video recording of the window contents
 
         Returns:
-           VideoWriter : A handle to the video file, that can be used for appending frames.
+           RecordingThread : A handle to the recording, that can be used for appending frames.
         """
         now = time.strftime("%Y%m%d--%H%M%S")
-        #do NOT use mp4 here, it is flakey!
-        video_handle = cv2.VideoWriter(now + 'output.avi',
-                                        cv2.VideoWriter_fourcc(*'XVID'),
-                                        25,
-                                        (self.thermal_camera.scaled_width,
-                                        self.thermal_camera.scaled_height))
-        return video_handle
+        frame_size = (self.thermal_camera.scaled_width, self.thermal_camera.scaled_height)
+
+        # Prefer encoding on the GPU, so the encoder does not compete with the GUI
+        writer_options = []
+        if cv2.videoio_registry.hasBackend(cv2.CAP_GSTREAMER):
+            for encoder in self.HARDWARE_ENCODERS:
+                #do NOT use mp4 here, it is flakey!
+                pipeline = f'appsrc ! videoconvert ! {encoder} ! h264parse ! ' \
+                           f'matroskamux ! filesink location={now}output.mkv'
+                writer_options.append((pipeline, cv2.CAP_GSTREAMER, 0, 25, frame_size))
+
+        # Fall back to encoding XVID on the CPU
+        writer_options.append((now + 'output.avi',
+                                cv2.VideoWriter_fourcc(*'XVID'),
+                                25,
+                                frame_size))
+
+        recording_thread = RecordingThread(frame_size, *writer_options)
+        recording_thread.start()
+        return recording_thread
 
     def _snapshot(self, image):
         """ Creates a snapshot of the current contents of
@@ -362,7 +791,9 @@ class ThermalApp:
         #I would put colons in here, but it Win throws a fit if you try and open them!
         now = time.strftime("%Y%m%d-%H%M%S")
         snaptime = time.strftime("%H:%M:%S")
-        cv2.imwrite(f"TC{now}.png", image)
+        # Encode and save the image in the background, so the GUI does not stall.
+        # The frame is copied, as it may still be drawn on or reused.
+        self._io_pool.submit(cv2.imwrite, f"TC{now}.png", image.copy())
         return snaptime
 
 
@@ -375,6 +806,28 @@ class ThermalApp:
                         self.thermal_camera.scaled_height)
         cv2.setMouseCallback(self.WINDOW_NAME, self._handle_mouse_input, param=self)
 
+    #TODO: Load keymap from a configuration file
+    # Maps the key codes returned by waitKey to their handlers
+    _KEYMAP = {
+        _K_O: _key_toggle_point_erase_mode,
+        _K_A: _key_increase_blur,
+        _K_Z: _key_decrease_blur,
+        _K_S: _key_increase_threshold,
+        _K_X: _key_decrease_threshold,
+        _K_D: _key_increase_scaling,
+        _K_C: _key_decrease_scaling,
+        _K_E: _key_enable_fullscreen,
+        _K_W: _key_disable_fullscreen,
+        _K_F: _key_increase_contrast,
+        _K_V: _key_decrease_contrast,
+        _K_H: _key_toggle_hud,
+        _K_M: _key_next_colormap,
+        _K_R: _key_start_recording,
+        _K_T: _key_stop_recording,
+        _K_P: _key_snapshot,
+        _K_Q: _key_quit,
+    }
+
 @click.command()
 @click.option("--device", default=0, help="Video Device number e.g. 0, use v4l2-ctl --list-devices")
 @click.option("--scale", default=3, help="The scaler to scale the image with, default 3.")
@@ -392,7 +845,14 @@ class ThermalApp:
                             'Parula',
                             'InvRainbow'], case_sensitive=True),
             default="Jet", help="Colormap to use.")
-def main(device, scale, alpha, colormap):
+@click.option("--cuda/--no-cuda", default=False,
+            help="Process the image on the GPU, requires OpenCV built with CUDA.")
+@click.option("--opencl/--no-opencl", default=False,
+            help="Process the image with OpenCL, e.g. on an integrated GPU.")
+@click.option("--interp",
+            type=click.Choice(['Nearest', 'Linear', 'Cubic'], case_sensitive=True),
+            default="Linear", help="Interpolation used for scaling, Cubic is smoother but slower.")
+def main(device, scale, alpha, colormap, cuda, interp, opencl):
     """ Main entry point for the application
 
     Args:
@@ -400,8 +860,13 @@ def main(device, scale, alpha, colormap):
         scale (int): The scaling factor to apply to the read image
         alpha (float): The contrast value to apply to the camera image
         colormap (string): The colormap to apply to the camera image
+        cuda (bool): Process the camera image on the GPU
+        interp (string): The interpolation to scale the camera image with
+        opencl (bool): Process the camera image with OpenCL
     """
-    camera = ThermalCamera(device, scale, alpha, colormap)
+    # OpenCV uses OpenCL on UMat frames by default, only allow it if requested
+    cv2.ocl.setUseOpenCL(opencl and cv2.ocl.haveOpenCL())
+    camera = ThermalCamera(device, scale, alpha, colormap, cuda, interp, opencl)
     ThermalApp(camera)
 
 def usage():
@@ -1,7 +1,9 @@
 #!/usr/bin/env python3
 
 from dataclasses import dataclass
-import io
+import functools
+import platform
+import time
 import cv2
 import numpy as np
 
@@ -15,31 +17,36 @@ class Point:
         y_pos (int): The y-coordinate of the point.
         temperature (float): The temperature value associated with this point.
     """
+    # No per-instance __dict__, the fields are stored in slots
+    __slots__ = ('x_pos', 'y_pos', 'temperature')
+
     x_pos: int
     y_pos: int
     temperature: float
 
-class DynamicList(list):
-    """ A data structure to act as a list, with the added functionality of removing
-    one of the list elements."""
-
-    def remove(self, index):
-        """
-        Removes the element at the specified index from this list.
+@dataclass
+class FrameStats:
+    """
+    A data class holding the temperature readings of a single frame.
 
-        Args:
-            index (int): The index of the element to be removed. 
-                         Index must be within range (0 <= index < len(self)).
-        Raises:
-            IndexError: If the index is out of range (i.e., not in the range [0, len(self)-1]).
-        Returns:
-            None
-        """
+    Attributes:
+        center_point (Point): The center of the image.
+        min_point (Point): The coldest point of the image.
+        max_point (Point): The hottest point of the image.
+        avg_temp (float): The average temperature of the image.
+        user_point_readings (tuple): The (x, y) positions of the user points
+            and their temperatures.
+        scale (int): The scaling multiplier the frame was built with.
+    """
+    __slots__ = ('center_point', 'min_point', 'max_point', 'avg_temp', 'user_point_readings',
+                 'scale')
 
-        if 0 <= index < len(self):
-            super().pop(index)
-        else:
-            raise IndexError("Index out of range")
+    center_point: Point
+    min_point: Point
+    max_point: Point
+    avg_temp: float
+    user_point_readings: tuple
+    scale: int
 
 class ThermalCamera:
     """Class to represent the thermal camera object
@@ -64,7 +71,25 @@ class ThermalCamera:
         {'name' : 'InvRainbow', "cv_map" : cv2.COLORMAP_RAINBOW}
     ]
 
-    def __init__(self, device, scale, alpha, colormap_name):
+    # Index of every colormap in COLORMAPS by name
+    _COLORMAP_INDEX = {map_dict['name'] : index for index, map_dict in enumerate(COLORMAPS)}
+
+    # Interpolation methods for upscaling the frame
+    INTERPOLATIONS = {
+        'Nearest' : cv2.INTER_NEAREST,
+        'Linear' : cv2.INTER_LINEAR,
+        'Cubic' : cv2.INTER_CUBIC
+    }
+
+    # A grab that returns faster than this was served from the driver queue,
+    # i.e. the frame is stale and was captured while we were busy.
+    STALE_GRAB_TIME_NS = 5_000_000
+
+    # Maximum number of stale frames to discard per retrieved frame
+    MAX_STALE_FRAMES = 4
+
+    def __init__(self, device, scale, alpha, colormap_name, use_cuda=False,
+                 interpolation_name='Linear', use_opencl=False):
         """Initializes the thermal camera
 
         Args:
@@ -72,6 +97,9 @@ class ThermalCamera:
             scale (float): The scale with which to scale the camera image
             alpha (float): The contrast correction value
             colormap_name (str): Name of the colormap to apply
+            use_cuda (bool): Process the image on the GPU, if OpenCV was built with CUDA
+            interpolation_name (str): Name of the interpolation method used for upscaling
+            use_opencl (bool): Process the image with OpenCL, if OpenCV uses an OpenCL device
         """
 
         # We need to know if we are running on the Pi,
@@ -82,10 +110,17 @@ class ThermalCamera:
         # Initialize the video stream
         self.cap = cv2.VideoCapture(f'/dev/video{device}', cv2.CAP_V4L)
 
+        # Only keep the latest frame in the driver, otherwise frames pile up
+        # while the GUI is busy and the latency grows to several seconds.
+        if not self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1):
+            print('Warning: could not limit the capture buffer, the latency might increase')
+
         # Pull in the video but do NOT automatically convert to RGB,
         # else it breaks the temperature data!
         # https://stackoverflow.com/questions/63108721/opencv-setting-videocap-property-to-cap-prop-convert-rgb-generates-weird-boolean
         if self.is_pi:
+            # Request the raw YUYV format explicitly, so the driver does not negotiate another one
+            self.cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*'YUYV'))
             self.cap.set(cv2.CAP_PROP_CONVERT_RGB, 0.0)
         else:
             # For some systems 0.0 need to be replaced by a boolean
@@ -101,9 +136,16 @@ class ThermalCamera:
         self.scaled_height = self.sensor_height * self.scale
         self.alpha = alpha
         self.colormap_name = colormap_name
+        self.interpolation = self.INTERPOLATIONS[interpolation_name]
 
         # Extract the list index of the given colormap name
         self.colormap_index = self._find_colormap_index(self.colormap_name)
+
+        # OpenCV colormap ids by index, so no dict lookups are needed per frame.
+        # The inverted rainbow is the rainbow colormap with red and blue swapped.
+        self._colormap_ids = tuple(map_dict['cv_map'] for map_dict in self.COLORMAPS)
+        self._inverted_colormap_index = self._find_colormap_index('InvRainbow')
+        # Size of the blur box in sensor pixels, the blur is applied before upscaling
         self.blur_radius = 0
         self.threshold = 2
 
@@ -112,12 +154,49 @@ class ThermalCamera:
         self.min_point = Point(0, 0, 0)
         self.max_point = Point(0, 0, 0)
 
-        # Initialize a dynamic list to store user points
-        self.user_points = DynamicList()
+        # The user points are stored as an array of (x, y) positions, so all their
+        # temperatures can be read at once. The positions and the temperatures of
+        # the last frame are published together, as the GUI reads them from
+        # another thread.
+        self._point_positions = np.empty((0, 2), np.intp)
+        self.user_point_readings = (self._point_positions, np.empty(0))
 
         # Initialize a variable to store the average temperature
         self.avg_temp = 0
 
+        # Readings of the last frame, see get_frame
+        self.stats = FrameStats(self.center_point, self.min_point, self.max_point,
+                                self.avg_temp, self.user_point_readings, self.scale)
+
+        # Reusable buffers for the captured frame and its luma
+        self._frame = None
+        self._gray = None
+
+        # Image processing function, rebuilt when its settings change
+        self._pipeline = None
+        self._pipeline_key = None
+
+        # Process the image on the GPU if requested and available
+        self.use_cuda = use_cuda and self._is_cuda_available()
+        if use_cuda and not self.use_cuda:
+            print('CUDA is not available, processing the image on the CPU')
+        if self.use_cuda:
+            self._gpu_gray = cv2.cuda_GpuMat()
+            self._gpu_scaled = cv2.cuda_GpuMat()
+            self._gpu_blurred = cv2.cuda_GpuMat()
+            self._gpu_expanded = cv2.cuda_GpuMat()
+            self._gpu_heatmap = cv2.cuda_GpuMat()
+            self._gpu_blur_filter = None
+            self._gpu_blur_radius = 0
+            self._gpu_colormap = None
+            self._gpu_colormap_key = None
+
+        # Without CUDA, process the image with OpenCL if requested and OpenCV uses it.
+        # useOpenCL() is only true if a device is available and OpenCL was not disabled.
+        self.use_opencl = use_opencl and not self.use_cuda and cv2.ocl.useOpenCL()
+        if use_opencl and not self.use_cuda and not self.use_opencl:
+            print('OpenCL is not available, processing the image on the CPU')
+
     def capture_status(self):
         """Get the status of the capture object
 
@@ -146,13 +225,19 @@ class ThermalCamera:
         if not self.cap.isOpened():
             raise IOError("The capture device is not open!")
 
-        # Capture frame
-        ret, frame = self.cap.read()
+        # Capture the freshest frame, only the grabbed frame gets decoded
+        if not self._grab_latest():
+            raise IOError("Received empty frame!")
+        # The captured frame is only used within this function, so its buffer is reused
+        ret, self._frame = self.cap.retrieve(self._frame)
         if not ret:
             raise IOError("Received empty frame!")
 
-        # Split the frame into image data and thermal data
-        imdata, thdata = np.array_split(frame, 2) # pylint: disable=W0632
+        # Split the frame into image data and thermal data, without copying.
+        # The split follows the received frame, not the size reported by the driver.
+        half = self._frame.shape[0] >> 1
+        imdata = self._frame[:half]
+        thdata = self._frame[half:]
 
         # Now parse the data from the bottom frame and convert to temp!
         # https://www.eevblog.com/forum/thermal-imaging/infiray-and-their-p2-pro-discussion/200/
@@ -160,36 +245,39 @@ class ThermalCamera:
         # stored and how to compute temp from it.
         # grab data from the center pixel...
 
-        # Calculate temperatures for the entire frame
-        thermal_matrix = thdata[...,1].astype('uint16') * 256
-        thermal_matrix = thermal_matrix + thdata[..., 0]
-        thermal_matrix = thermal_matrix/64 - 273.15
-        thermal_matrix = thermal_matrix.round(2)
+        # Combine the two bytes of every pixel into the raw sensor value in 1/64 K,
+        # only the extracted values are converted to temperatures
+        raw, self.min_point, self.max_point, self.avg_temp = self._extract_stats(thdata)
 
         # Extract different temperature points
-        self.center_point = self._extract_center_temp(thermal_matrix)
-        self.max_point = self._extract_max_temp(thermal_matrix)
-        self.min_point = self._extract_min_temp(thermal_matrix)
-        self.avg_temp = self._extract_avg_temp(thermal_matrix)
+        self.center_point = self._extract_center_temp(raw)
 
         # Extract user points
-        for point in self.user_points:
-            point.temperature = thermal_matrix[point.y_pos][point.x_pos]
-
-        # Convert real image to RGB
-        bgr = cv2.cvtColor(imdata,  cv2.COLOR_YUV2BGR_YUYV)
-        # Set the contrast
-        bgr = cv2.convertScaleAbs(bgr, alpha=self.alpha)#Contrast
-        # Bicubic interpolate, upscale and blur
-        bgr = cv2.resize(bgr,(self.scaled_width, self.scaled_height),
-                            interpolation=cv2.INTER_CUBIC)#Scale up!
-        if self.blur_radius > 0:
-            bgr = cv2.blur(bgr, (self.blur_radius, self.blur_radius))
-
-        # Apply the colormap
-        heatmap = self._apply_colormap(bgr)
-
-        return heatmap
+        positions = self._point_positions
+        temperatures = raw[positions[:, 1], positions[:, 0]] / 64 - 273.15
+        self.user_point_readings = (positions, temperatures)
+
+        # The colormap only depends on the brightness, so only the luma is used
+        # and the frame is never converted to BGR. The colormap table expands
+        # the luma to the full range.
+        self._gray = cv2.cvtColor(imdata, cv2.COLOR_YUV2GRAY_YUYV, dst=self._gray)
+
+        # The image processing is rebuilt only when one of its settings changed
+        pipeline_key = (self.scale, self.blur_radius, self.alpha,
+                        self.colormap_index, self.interpolation)
+        if pipeline_key != self._pipeline_key:
+            # The settings are changed from the GUI thread, so the pipeline is built
+            # from the values in the key instead of reading them again
+            self._pipeline = self._build_pipeline(*pipeline_key)
+            self._pipeline_key = pipeline_key
+
+        # All readings of this frame are published at once, so the GUI thread
+        # never mixes them with the readings of the next frame. The scale is
+        # the one the frame is built with, the GUI draws the markers with it.
+        self.stats = FrameStats(self.center_point, self.min_point, self.max_point,
+                                self.avg_temp, self.user_point_readings, pipeline_key[0])
+
+        return self._pipeline(self._gray)
 
     def increase_scaling(self):
         """Increase the scaling of the image with 1. Max. 5.
@@ -247,9 +335,8 @@ class ThermalCamera:
     def next_colormap(self):
         """Apply the next colormap from the list.
         """
-        self.colormap_index += 1
-        if self.colormap_index == 11:
-            self.colormap_index = 0
+        # Assigned at once, so the capture thread never sees an index out of range
+        self.colormap_index = (self.colormap_index + 1) % len(self.COLORMAPS)
 
         return self.COLORMAPS[self.colormap_index]["name"]
 
@@ -261,7 +348,7 @@ class ThermalCamera:
             y (int): y position within the frame (camera sensor coordinates)
         """
 
-        self.user_points.append(Point(x, y, 0))
+        self._point_positions = np.append(self._point_positions, [(x, y)], axis=0)
 
     def remove_point(self, point_number:int):
         """Removes a point from the user temperature monitoring list.
@@ -269,8 +356,39 @@ class ThermalCamera:
         Args:
             point_number (int): The index of the point to remove
         """
-        if point_number >= 0 and point_number < len(self.user_points):
-            self.user_points.remove(point_number)
+        try:
+            self._point_positions = np.delete(self._point_positions, point_number, axis=0)
+        except IndexError:
+            pass
+
+    @property
+    def user_points(self):
+        """list: The user points as Point objects, with the temperatures of the last frame."""
+        positions, temperatures = self.user_point_readings
+        return [Point(x_pos, y_pos, temperature) for (x_pos, y_pos), temperature
+                in zip(positions.tolist(), temperatures.tolist())]
+
+    def _grab_latest(self):
+        """Grabs a frame from the camera, discarding the frames that were queued
+        by the driver while the previous frame was being processed.
+
+        Returns:
+            boolean: True if a frame was grabbed, false otherwise.
+        """
+        start = time.monotonic_ns()
+        if not self.cap.grab():
+            return False
+
+        # Queued frames are returned immediately, keep grabbing until
+        # we have to wait for the camera to deliver a new frame.
+        for _ in range(self.MAX_STALE_FRAMES):
+            if time.monotonic_ns() - start > self.STALE_GRAB_TIME_NS:
+                break
+            start = time.monotonic_ns()
+            if not self.cap.grab():
+                return False
+
+        return True
 
     def _find_colormap_index(self, colormap_name):
         """Finds the index of the colormap in the COLORMAPS list,
@@ -282,99 +400,209 @@ class ThermalCamera:
         Returns:
             int: Index of the colormap or None if the specified name was not found.
         """
-        for colormap_index, map_dict in enumerate(self.COLORMAPS):
-            if map_dict['name'] == colormap_name:
-                return colormap_index
+        return self._COLORMAP_INDEX.get(colormap_name)
 
-        return None
-
-    def _apply_colormap(self, image):
-        """Applies the currently selected colormap to the frame
+    def _process_image_cuda(self, gray, scaled_size):
+        """Applies the contrast, scaling, blur and colormap to the frame on the GPU
 
         Args:
-            image (UMat): The frame
+            gray (ndarray): The grayscale frame in sensor resolution
+            scaled_size (tuple): The (width, height) of the upscaled frame
 
         Returns:
-            UMat: The frame with the applied colormap
+            ndarray: The colormapped frame
         """
-        colormap = self.COLORMAPS[self.colormap_index]['cv_map']
-
-        image = cv2.applyColorMap(image, colormap)
-        if self.COLORMAPS[self.colormap_index]['name'] == "InvRaibow":
-            image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+        self._gpu_gray.upload(gray)
+
+        # Blur in sensor resolution, the CUDA box filter does not support 3 channel images
+        gray = self._gpu_gray
+        if self.blur_radius > 1:
+            if self.blur_radius != self._gpu_blur_radius:
+                self._gpu_blur_filter = cv2.cuda.createBoxFilter(
+                    cv2.CV_8UC1, cv2.CV_8UC1, (self.blur_radius, self.blur_radius),
+                    borderMode=cv2.BORDER_REPLICATE)
+                self._gpu_blur_radius = self.blur_radius
+            self._gpu_blur_filter.apply(gray, dst=self._gpu_blurred)
+            gray = self._gpu_blurred
+
+        # Apply the contrast and the colormap as a lookup table
+        if (self.colormap_index, self.alpha) != self._gpu_colormap_key:
+            self._gpu_colormap = cv2.cuda.createLookUpTable(
+                self._build_colormap_lut(self.colormap_index, self.alpha))
+            self._gpu_colormap_key = (self.colormap_index, self.alpha)
+        cv2.cuda.cvtColor(gray, cv2.COLOR_GRAY2BGR, dst=self._gpu_expanded)
+        self._gpu_colormap.transform(self._gpu_expanded, dst=self._gpu_heatmap)
+
+        # Interpolate and upscale
+        cv2.cuda.resize(self._gpu_heatmap, scaled_size,
+                        dst=self._gpu_scaled, interpolation=self.interpolation)
+
+        return self._gpu_scaled.download()
+
+    @staticmethod
+    def _is_cuda_available():
+        """Determines if OpenCV can use a CUDA device
 
-        return image
+        Returns:
+            boolean: True if a CUDA device is available, false otherwise.
+        """
+        try:
+            return cv2.cuda.getCudaEnabledDeviceCount() > 0
+        except (AttributeError, cv2.error):
+            return False
 
-    def _extract_center_temp(self, thdata):
-        """Extract the temperature of the center of the image
+    def _build_pipeline(self, scale, blur_radius, alpha, colormap_index, interpolation):
+        """Builds the image processing function for the given settings. The settings
+        are bound once, so the processing does not look them up for every frame.
 
         Args:
-            thdata (ndarray): 2-dimensional array with thermal data
+            scale (int): The scale with which to scale the camera image
+            blur_radius (int): The size of the blur box in sensor pixels
+            alpha (float): The contrast correction value
+            colormap_index (int): Index of the colormap in the COLORMAPS list
+            interpolation (int): The OpenCV interpolation method used for upscaling
 
         Returns:
-            float: Temperature of the image center
+            function: Takes the grayscale frame in sensor resolution and returns
+                the colormapped frame, as a UMat if OpenCL is used.
         """
-        self.center_point.temperature = thdata[self.center_point.y_pos][self.center_point.x_pos]
-        return  self.center_point
-
-    def _extract_max_temp(self, thdata):
-        """Extract the maximum temperature of the image.
+        # Not scaled_width and scaled_height, they are set after the scale
+        scaled_size = (self.sensor_width * scale, self.sensor_height * scale)
+
+        if self.use_cuda:
+            return lambda gray: self._process_image_cuda(gray, scaled_size)
+        # A 1x1 box does not change the frame
+        blur_size = (blur_radius, blur_radius) if blur_radius > 1 else None
+        # applyColorMap takes a user colormap as a 256x1 table. Unlike LUT, it maps
+        # the gray image directly, without expanding it to 3 channels first.
+        colormap = self._build_colormap_lut(colormap_index, alpha).reshape(256, 1, 3)
+
+        if self.use_opencl:
+            def process_image_opencl(gray):
+                # OpenCV runs its OpenCL kernels on UMat frames,
+                # their buffers are left to the OpenCL buffer pool
+                frame = cv2.UMat(gray)
+                if blur_size:
+                    frame = cv2.boxFilter(frame, -1, blur_size, borderType=cv2.BORDER_REPLICATE)
+                frame = cv2.applyColorMap(frame, colormap)
+                return cv2.resize(frame, scaled_size, interpolation=interpolation)#Scale up!
+
+            return process_image_opencl
+
+        # The intermediate frames are written into the buffers of the previous frame
+        blurred = None
+        heatmap = None
+
+        def process_image(gray):
+            nonlocal blurred, heatmap
+
+            # Blur in sensor resolution, instead of on the upscaled frame
+            if blur_size:
+                blurred = cv2.boxFilter(gray, -1, blur_size, dst=blurred,
+                                        borderType=cv2.BORDER_REPLICATE)
+                gray = blurred
+
+            # Apply the contrast and the colormap in sensor resolution as well
+            heatmap = cv2.applyColorMap(gray, colormap, dst=heatmap)
+
+            # Interpolate and upscale, this allocates the returned frame,
+            # as the GUI draws on it
+            return cv2.resize(heatmap, scaled_size, interpolation=interpolation)#Scale up!
+
+        return process_image
+
+    def _build_colormap_lut(self, colormap_index, alpha):
+        """Builds a lookup table mapping the 256 luma values to the colors of a colormap,
+        after setting the contrast
 
         Args:
-            thdata (ndarray): 2-dimensional array with thermal data
+            colormap_index (int): Index of the colormap in the COLORMAPS list
+            alpha (float): The contrast correction value
 
         Returns:
-            Point: The Point object, that contains the coordinates and the temperature.
+            ndarray: The 1x256 BGR lookup table
         """
-        max_val = thdata.max()
+        # The frame is colormapped by its luma, which is in the limited range (16..235).
+        # Convert a ramp of all luma values with neutral chroma to BGR once, which
+        # expands them to the full range, and set the contrast on it. This gives the
+        # same gray levels as converting and scaling the whole frame did.
+        ramp = np.full((1, 256, 2), 128, np.uint8)
+        ramp[..., 0] = np.arange(256)
+        bgr = cv2.convertScaleAbs(cv2.cvtColor(ramp, cv2.COLOR_YUV2BGR_YUYV), alpha=alpha)
+        levels = cv2.cvtColor(bgr, cv2.COLOR_BGR2GRAY)
+        lut = cv2.applyColorMap(levels, self._colormap_ids[colormap_index])
+        if colormap_index == self._inverted_colormap_index:
+            lut = cv2.cvtColor(lut, cv2.COLOR_BGR2RGB)
+
+        return lut
+
+    def _extract_center_temp(self, raw):
+        """Extract the temperature of the center of the image
 
-        # This will return array, as multiple points
-        # might have the same value, we will just extract the first point
-        mcol, mrow = np.where((thdata == max_val))
-        mrow = mrow[0]
-        mcol = mcol[0]
+        Args:
+            raw (ndarray): 2-dimensional array with raw thermal data
 
-        return Point(mcol, mrow, max_val)
+        Returns:
+            Point: A new center Point with the temperature of the image center
+        """
+        # A new Point, the one of the previous frame might still be drawn
+        x_pos, y_pos = self.center_point.x_pos, self.center_point.y_pos
+        return Point(x_pos, y_pos, self._to_celsius(raw[y_pos, x_pos]))
 
-    def _extract_min_temp(self, thdata):
-        """Extract the minimum temperature of the image.
+    def _extract_stats(self, thdata):
+        """Extract the raw thermal data and the minimum, maximum and average
+        temperature of the image. OpenCV finds the minimum and the maximum
+        in a single vectorized pass.
 
         Args:
-            thdata (ndarray): 2-dimensional array with thermal data
+            thdata (ndarray): Thermal data, the low and the high byte of every pixel
 
         Returns:
-            Point: The Point object, that contains the coordinates and the temperature.
+            tuple: The 2-dimensional array with raw thermal data, the minimum
+                and maximum Point objects and the average temperature.
         """
-        min_val = thdata.min()
+        # The low and the high byte are stored next to each other,
+        # so the raw values are a little endian uint16 view of the data
+        raw = thdata.view('<u2')[..., 0]
 
-        # This will return array, as multiple points
-        # might have the same value, we will just extract the first point
-        mcol, mrow = np.where((thdata == min_val))
-        mrow = mrow[0]
-        mcol = mcol[0]
+        # Multiple points might have the same value, minMaxLoc returns the first one
+        min_val, max_val, (min_col, min_row), (max_col, max_row) = cv2.minMaxLoc(raw)
+        avg_val = cv2.mean(raw)[0]
 
-        return Point(mcol, mrow, min_val)
+        return (raw,
+                Point(min_col, min_row, self._to_celsius(min_val)),
+                Point(max_col, max_row, self._to_celsius(max_val)),
+                self._to_celsius(avg_val))
 
-    def _extract_avg_temp(self, thdata):
-        """Extract the average temperature of the image.
+    @staticmethod
+    def _to_celsius(raw_value):
+        """Converts a raw thermal sensor value to a temperature
 
         Args:
-            thdata (ndarray): 2-dimensional array with thermal data
+            raw_value (float): Raw sensor value in 1/64 Kelvin
 
         Returns:
-            float: The average temperature of the image.
+            float: The temperature in degrees Celsius.
         """
-        temp = round(thdata.mean(), 2)
-        return temp
+        # Convert the NumPy scalar once, the arithmetic is faster on a Python float.
+        # It is not rounded, only the displayed text is.
+        return float(raw_value) / 64 - 273.15
 
-    def _is_raspberry_pi(self):
-        """Determines if this software is running on a Raspberry Pi
+    @staticmethod
+    @functools.lru_cache(maxsize=1)
+    def _is_raspberry_pi():
+        """Determines if this software is running on a Raspberry Pi.
+        The result is cached, the platform does not change while running.
 
         Returns:
             boolean: True if it is running on a Raspberry pi, false otherwise.
         """
+        # Only ARM machines can be a Pi, this avoids reading the device tree elsewhere
+        if not platform.machine().startswith(('arm', 'aarch64')):
+            return False
+
         try:
-            with io.open('/sys/firmware/devicetree/base/model', 'r', encoding='utf-8') as m:
+            with open('/sys/firmware/devicetree/base/model', 'r', encoding='utf-8') as m:
                 if 'raspberry pi' in m.read().lower():
                     return True
         except Exception: